@@ -2,8 +2,22 @@ from __future__ import annotations
 
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import duckdb
+
+from nc_sources import (
+    cache_is_fresh,
+    cache_path_for,
+    cache_staging_path,
+    connect,
+    ncvhis_cache,
+    ncvhis_scan,
+    ncvoter_attrs_cache,
+    publish_cache,
+)
+
+# Low-cardinality bucket columns stored as ENUMs (1-byte codes) for the GROUP BY and join.
+ENUM_COLUMNS = ("party_cd", "race_code", "ethnic_code", "sex_code", "age_group")
 
 
 def mmddyyyy_to_iso(mmddyyyy: str) -> str:
@@ -12,15 +26,131 @@ def mmddyyyy_to_iso(mmddyyyy: str) -> str:
     return f"{y}-{m.zfill(2)}-{d.zfill(2)}"
 
 
+def load_denominator(con, voter_stats_path: str, election_mmddyyyy: str, election_iso: str, cache_dir: str):
+    # -----------------------
+    # 1) Denominator: voter_stats
+    # -----------------------
+    # Layout (based on your examples):
+    # county_desc, election_date, stats_type, precinct_abbrv, vtd_abbrv, party_cd, race_code,
+    # ethnic_code, sex_code, age, total_voters, update_date
+    # The raw rows are only read once, so project the needed columns in a CTE instead of
+    # materializing the whole file as a table first.
+    # Tables from a previous run hold the ENUM types below, so drop them before the types.
+    con.execute("DROP TABLE IF EXISTS turnout_buckets;")
+    con.execute("DROP TABLE IF EXISTS voted_aggregated;")
+    con.execute("DROP TABLE IF EXISTS voter_stats_denominator;")
+    # The denominator depends only on the voter_stats file, so it is cached as Parquet; warm runs
+    # skip the raw scan. The cache holds plain VARCHARs, the ENUM types are rebuilt below. It is
+    # keyed by both the election and the voter_stats file it was read from.
+    cache_path = cache_path_for(
+        cache_dir, f"voter_stats_denominator_v3_{election_iso}", voter_stats_path, ".parquet"
+    )
+    if cache_is_fresh(cache_path, voter_stats_path):
+        print(f"[INFO] denominator from cache: {cache_path}")
+        con.execute(
+            "CREATE TABLE voter_stats_denominator AS SELECT * FROM read_parquet(?)",
+            [str(cache_path)],
+        )
+    else:
+        con.execute(
+            """
+            CREATE TABLE voter_stats_denominator AS
+            WITH voter_stats_raw AS (
+                SELECT
+                    -- quote='' with the quotes stripped in SQL: a stray quote in a free-text
+                    -- field (precinct names) cannot break the parse, and "" stays '' so an empty
+                    -- code still matches the same empty code on the numerator side
+                    upper(replace(trim(column0), '"', '')) AS county_desc,
+                    replace(trim(column2), '"', '') AS stats_type,
+                    replace(trim(column5), '"', '') AS party_cd,
+                    replace(trim(column6), '"', '') AS race_code,
+                    replace(trim(column7), '"', '') AS ethnic_code,
+                    replace(trim(column8), '"', '') AS sex_code,
+                    replace(trim(column9), '"', '') AS age_group,
+                    TRY_CAST(replace(trim(column10), '"', '') AS INTEGER) AS total_voters
+                FROM read_csv(
+                    ?, delim='\\t', header=false, quote='', escape='', auto_detect=false,
+                    columns={
+                        'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
+                        'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
+                        'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR'
+                    }
+                )
+                WHERE replace(trim(column1), '"', '') = ?
+            )
+            SELECT
+                ? AS election_date, -- ISO
+                county_desc,
+                party_cd,
+                race_code,
+                ethnic_code,
+                sex_code,
+                age_group,
+                -- BIGINT rather than SUM's HUGEINT, which Parquet would store as DOUBLE
+                SUM(total_voters)::BIGINT AS registered_count
+            FROM voter_stats_raw
+            WHERE total_voters IS NOT NULL
+            AND lower(stats_type) = 'voter'
+            GROUP BY 1,2,3,4,5,6,7
+            """,
+            [voter_stats_path, election_mmddyyyy, election_iso],
+        )
+        if con.execute("SELECT COUNT(*) FROM voter_stats_denominator").fetchone()[0]:
+            staging = cache_staging_path(cache_path)
+            con.execute(
+                "COPY voter_stats_denominator TO ? (FORMAT PARQUET, COMPRESSION ZSTD)",
+                [str(staging)],
+            )
+            publish_cache(staging, cache_path)
+        else:
+            # most likely the wrong --voter_stats for this election; don't let a rerun reuse it
+            print(f"[WARN] no voter rows for {election_mmddyyyy} in {voter_stats_path}; denominator not cached")
+
+    # The denominator defines every bucket a vote can land in, so its values are the ENUM domains.
+    for col in ENUM_COLUMNS:
+        con.execute(f"DROP TYPE IF EXISTS {col}_enum;")
+        con.execute(
+            f"CREATE TYPE {col}_enum AS ENUM "
+            f"(SELECT DISTINCT {col} FROM voter_stats_denominator WHERE {col} IS NOT NULL ORDER BY 1)"
+        )
+        con.execute(f"ALTER TABLE voter_stats_denominator ALTER {col} TYPE {col}_enum;")
+
+
+def load_ncvoter_attrs(con, ncvoter_path: str, cache_dir: str):
+    # -----------------------
+    # 3) Attributes: ncvoter (only needed columns), from the shared Parquet cache
+    # -----------------------
+    con.execute("DROP TABLE IF EXISTS ncvoter_attrs;")
+    con.execute(
+        "CREATE TABLE ncvoter_attrs AS SELECT * FROM read_parquet(?)",
+        [str(ncvoter_attrs_cache(con, ncvoter_path, cache_dir))],
+    )
+
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--ncvhis", default="data/raw/ncvhis_Statewide.txt")
-    ap.add_argument("--ncvoter", default="data/raw/ncvoter_Statewide.txt")
+    # build_parquet_sources.py and the all-elections build default to data/raw/ncvhis/... and
+    # data/raw/ncvoter/...; their caches are only reused here when given the same paths
+    ap.add_argument(
+        "--ncvhis",
+        default="data/raw/ncvhis_Statewide.txt",
+        help="statewide NCVHIS TSV; its Parquet cache is keyed by this path",
+    )
+    ap.add_argument(
+        "--ncvoter",
+        default="data/raw/ncvoter_Statewide.txt",
+        help="statewide NCVoter TSV; its Parquet cache is keyed by this path",
+    )
     ap.add_argument("--voter_stats", default="data/raw/voter_stats_20251104.txt")
     ap.add_argument("--election_mmddyyyy", default="11/04/2025")
     ap.add_argument("--out_csv", default="src/data/county_demographic_turnout_20251104.csv")
     ap.add_argument("--db_path", default="data/derived/nc_turnout.duckdb")
     ap.add_argument("--qa_dir", default="data/derived/qa")
+    ap.add_argument(
+        "--cache_dir",
+        default="data/derived/cache",
+        help="Parquet copies of the cleaned denominator/ncvhis/ncvoter tables; rebuilt when the source file is newer",
+    )
     args = ap.parse_args()
 
     election_mmddyyyy = args.election_mmddyyyy
@@ -28,217 +158,65 @@ def main():
     election_year = int(election_iso.split("-")[0])
 
     Path(args.qa_dir).mkdir(parents=True, exist_ok=True)
+    Path(args.cache_dir).mkdir(parents=True, exist_ok=True)
     Path(os.path.dirname(args.out_csv)).mkdir(parents=True, exist_ok=True)
     Path(os.path.dirname(args.db_path)).mkdir(parents=True, exist_ok=True)
 
-    con = duckdb.connect(database=args.db_path)
-
-    # Speed + convenience
-    con.execute("PRAGMA threads=4;")
-    con.execute("PRAGMA enable_progress_bar=true;")
+    con = connect(args.db_path)
 
     # -----------------------
-    # 1) Denominator: voter_stats
+    # 1), 2) and 3) share nothing, so load them concurrently on cursors of the same database.
+    #    Each scan is parallel on its own; overlapping them keeps the CPU busy while another
+    #    one waits on disk.
     # -----------------------
-    # Layout (based on your examples):
-    # county_desc, election_date, stats_type, precinct_abbrv, vtd_abbrv, party_cd, race_code,
-    # ethnic_code, sex_code, age, total_voters, update_date
-    con.execute("DROP TABLE IF EXISTS voter_stats_raw;")
-    con.execute(
-        """
-        CREATE TABLE voter_stats_raw AS
-        SELECT
-            upper(replace(trim(column0), '"', '')) AS county_desc,
-            replace(trim(column1), '"', '') AS election_date_raw,
-            replace(trim(column2), '"', '') AS stats_type,
-            replace(trim(column3), '"', '') AS precinct_abbrv,
-            replace(trim(column4), '"', '') AS vtd_abbrv,
-            replace(trim(column5), '"', '') AS party_cd,
-            replace(trim(column6), '"', '') AS race_code,
-            replace(trim(column7), '"', '') AS ethnic_code,
-            replace(trim(column8), '"', '') AS sex_code,
-            replace(trim(column9), '"', '') AS age_group,
-            TRY_CAST(replace(trim(column10), '"', '') AS INTEGER) AS total_voters,
-            replace(trim(column11), '"', '') AS update_date_raw
-        FROM read_csv(
-            ?, delim='\\t', header=false, quote='', escape='',
-            columns={
-                'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
-                'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
-                'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR'
-            }
-        )
-        WHERE TRY_CAST(replace(trim(column10), '"', '') AS INTEGER) IS NOT NULL
-        """,
-        [args.voter_stats],
-    )
-
-    con.execute("DROP TABLE IF EXISTS voter_stats_denominator;")
-    con.execute(
-        """
-        CREATE TABLE voter_stats_denominator AS
-        SELECT
-            ? AS election_date, -- ISO
-            county_desc,
-            party_cd,
-            race_code,
-            ethnic_code,
-            sex_code,
-            age_group,
-            SUM(total_voters) AS registered_count
-        FROM voter_stats_raw
-        WHERE replace(election_date_raw, '"', '') = ?
-        AND lower(stats_type) = 'voter'
-        GROUP BY 1,2,3,4,5,6,7
-        """,
-        [election_iso, election_mmddyyyy],
-    )
+    with ThreadPoolExecutor(max_workers=3) as ex:
+        jobs = [
+            ex.submit(
+                load_denominator, con.cursor(), args.voter_stats, election_mmddyyyy, election_iso, args.cache_dir
+            ),
+            ex.submit(ncvhis_cache, con.cursor(), args.ncvhis, args.cache_dir),
+            ex.submit(load_ncvoter_attrs, con.cursor(), args.ncvoter, args.cache_dir),
+        ]
+        for job in jobs:
+            job.result()
+    ncvhis_path = jobs[1].result()
 
     # -----------------------
     # 2) Numerator base: ncvhis filtered to election
     # -----------------------
-    # Layout for ncvhis appears to be 15 columns (0..14)
-    con.execute("DROP TABLE IF EXISTS ncvhis_raw;")
-    con.execute(
-        """
-        CREATE TABLE ncvhis_raw AS
-        SELECT
-            trim(column3) AS election_lbl,
-            replace(trim(column10), '"', '') AS ncid,
-            upper(replace(trim(column1), '"', '')) AS county_desc
-        FROM read_csv(
-            ?, delim='\\t', header=false, quote='', escape='',
-            strict_mode=false, ignore_errors=true, null_padding=true, max_line_size=10000000,
-            columns={
-                'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
-                'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
-                'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR',
-                'column12':'VARCHAR','column13':'VARCHAR','column14':'VARCHAR'
-            }
-        )
-        WHERE trim(column3) IS NOT NULL AND length(trim(column3)) > 0
-        """,
-        [args.ncvhis],
-    )
-    # Debug: what election labels exist?
-    print("[DEBUG] sample election_lbl values:")
-    for row in con.execute(
-        """
-        SELECT election_lbl, COUNT(*) AS rows
-        FROM ncvhis_raw
-        GROUP BY 1
-        ORDER BY 1 DESC
-        LIMIT 15
-        """
-    ).fetchall():
-        print("   ", row[0], row[1])
-
-    #Debug: does anything match the target date loosely?
-    like_count = con.execute(
-        """
-        SELECT COUNT(*)
-        FROM ncvhis_raw
-        WHERE election_lbl LIKE '%2025%'
-        """
-    ).fetchone()[0]
-    print(f"[DEBUG] rows with election_lbl containing '2025': {like_count:,}")
-    con.execute("DROP TABLE IF EXISTS ncvhis_election;")
-    con.execute(
-        """
-        CREATE TABLE ncvhis_election AS
-        SELECT
-            county_desc,
-            replace(election_lbl, '"', '') AS election_lbl,
-            ncid
-        FROM ncvhis_raw
-        WHERE
-            -- drop header-ish row if present
-            lower(replace(election_lbl, '"', '')) != 'election_lbl'
-            AND replace(election_lbl, '"', '') = ?
-            AND ncid IS NOT NULL
-            AND length(trim(ncid)) > 0
-            AND lower(trim(ncid)) != 'ncid'
-        """,
-        [election_mmddyyyy],
-    )
-
-
-
-    # Dedupe to one row per NCID for this election
-    con.execute("DROP TABLE IF EXISTS voted_ncids;")
-    con.execute(
-        """
-        CREATE TABLE voted_ncids AS
-        SELECT
-            county_desc AS voted_county_desc,
-            ncid
-        FROM (
-            SELECT
-                county_desc,
-                ncid,
-                row_number() OVER (PARTITION BY ncid ORDER BY county_desc) AS rn
-            FROM ncvhis_election
-        )
-        WHERE rn = 1
-        """
-    )
+    # The history comes from the shared Parquet cache, partitioned by election_lbl, so the
+    # election filter below only opens the target election's files. It is only the source
+    # here; the filter and NCID dedupe run inside the voted_ncids statement, so no history rows
+    # are ever materialized.
+    ncvhis_src = f"SELECT election_lbl, ncid, county_desc FROM {ncvhis_scan(ncvhis_path)}"
 
     # -----------------------
-    # 3) Attributes: ncvoter (only needed columns)
+    # 4) Join voted -> ncvoter, bucket and aggregate; log QA
     # -----------------------
-    con.execute("DROP TABLE IF EXISTS ncvoter_attrs;")
+    # ncvhis scan -> election filter -> NCID dedupe is one pipeline. Dedupe keeps one row per
+    # NCID; min() makes the pick deterministic (alphabetically first county) with a plain hash
+    # aggregate, no window sort. Only the narrow deduped NCID list is kept, as a TEMP table;
+    # the joined rowset is a view, so it is never written out.
+    con.execute("DROP TABLE IF EXISTS voted_joined;")  # was a table in older databases
     con.execute(
-        """
-        CREATE TABLE ncvoter_attrs AS
-        SELECT
-            replace(trim(column3), '"', '') AS ncid,
-            upper(replace(trim(column1), '"', '')) AS reg_county_desc,
-            replace(trim(column28), '"', '') AS party_cd,
-            replace(trim(column26), '"', '') AS race_code,
-            replace(trim(column27), '"', '') AS ethnic_code,
-            replace(trim(column29), '"', '') AS sex_code,
-            replace(trim(column30), '"', '') AS birth_year
-        FROM read_csv(
-            ?, delim='\\t', header=false, quote='', escape='',
-            strict_mode=false,
-            ignore_errors=true,
-            null_padding=true,
-            max_line_size=10000000,
-            columns={
-                'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
-                'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
-                'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR',
-                'column12':'VARCHAR','column13':'VARCHAR','column14':'VARCHAR','column15':'VARCHAR',
-                'column16':'VARCHAR','column17':'VARCHAR','column18':'VARCHAR','column19':'VARCHAR',
-                'column20':'VARCHAR','column21':'VARCHAR','column22':'VARCHAR','column23':'VARCHAR',
-                'column24':'VARCHAR','column25':'VARCHAR','column26':'VARCHAR','column27':'VARCHAR',
-                'column28':'VARCHAR','column29':'VARCHAR','column30':'VARCHAR','column31':'VARCHAR',
-                'column32':'VARCHAR','column33':'VARCHAR','column34':'VARCHAR','column35':'VARCHAR',
-                'column36':'VARCHAR','column37':'VARCHAR','column38':'VARCHAR','column39':'VARCHAR',
-                'column40':'VARCHAR','column41':'VARCHAR','column42':'VARCHAR','column43':'VARCHAR',
-                'column44':'VARCHAR','column45':'VARCHAR','column46':'VARCHAR','column47':'VARCHAR',
-                'column48':'VARCHAR','column49':'VARCHAR','column50':'VARCHAR','column51':'VARCHAR',
-                'column52':'VARCHAR','column53':'VARCHAR','column54':'VARCHAR','column55':'VARCHAR',
-                'column56':'VARCHAR','column57':'VARCHAR','column58':'VARCHAR','column59':'VARCHAR',
-                'column60':'VARCHAR','column61':'VARCHAR','column62':'VARCHAR','column63':'VARCHAR',
-                'column64':'VARCHAR','column65':'VARCHAR','column66':'VARCHAR'
-            }
+        f"""
+        CREATE OR REPLACE TEMP TABLE voted_ncids AS
+        WITH ncvhis_election AS (
+            SELECT county_desc, ncid
+            FROM ({ncvhis_src})
+            WHERE election_lbl = ? -- the cache already dropped empty and header NCIDs
         )
-        WHERE replace(trim(column3), '"', '') IS NOT NULL
-        AND length(replace(trim(column3), '"', '')) > 0
-        AND lower(replace(trim(column3), '"', '')) != 'ncid'
+        SELECT
+            min(county_desc) AS voted_county_desc,
+            ncid
+        FROM ncvhis_election
+        GROUP BY ncid
         """,
-        [args.ncvoter],
+        [election_mmddyyyy],
     )
-
-
-    # -----------------------
-    # 4) Join voted -> ncvoter; log QA
-    # -----------------------
-    con.execute("DROP TABLE IF EXISTS voted_joined;")
     con.execute(
         """
-        CREATE TABLE voted_joined AS
+        CREATE OR REPLACE TEMP VIEW voted_joined AS
         SELECT
             v.voted_county_desc,
             a.reg_county_desc,
@@ -254,19 +232,86 @@ def main():
         """
     )
 
+    # Clean voted + compute age_group aligned to voter_stats bins, and aggregate.
+    # Use reg_county_desc for county bucket.
+    # One statement so the join, age bucketing and GROUP BY run as a single pipeline. Rows
+    # that found no voter record are kept as their own group (join_mismatch), and county
+    # mismatches are counted per group, so the QA counts below come from this same pass.
+    # Group on a TINYINT age bucket rather than the ~30-char age label; the label is decoded
+    # from the bucket once per group.
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE voted_grouped AS
+        WITH t AS (
+            -- age is computed once per row; birth_year is a SMALLINT that ncvoter_attrs already
+            -- set to NULL for missing, blank and non-numeric years
+            -- codes absent from the denominator cannot match a bucket; TRY_CAST maps them to NULL
+            SELECT
+                voted_county_desc,
+                reg_county_desc,
+                TRY_CAST(party_cd AS party_cd_enum) AS party_cd,
+                TRY_CAST(race_code AS race_code_enum) AS race_code,
+                TRY_CAST(ethnic_code AS ethnic_code_enum) AS ethnic_code,
+                TRY_CAST(sex_code AS sex_code_enum) AS sex_code,
+                ? - birth_year AS age
+            FROM voted_joined
+        ),
+        b AS (
+            SELECT
+                *,
+                CASE
+                    WHEN age IS NULL OR age < 18 THEN 0
+                    WHEN age <= 25 THEN 1
+                    WHEN age <= 40 THEN 2
+                    WHEN age <= 65 THEN 3
+                    ELSE 4
+                END::TINYINT AS age_bucket
+            FROM t
+        )
+        SELECT
+            reg_county_desc IS NULL AS join_mismatch,
+            reg_county_desc AS county_desc,
+            party_cd,
+            race_code,
+            ethnic_code,
+            sex_code,
+            TRY_CAST(list_extract(
+                ['Age < 18 Or Invalid Birth Dates', 'Age 18 - 25', 'Age 26 - 40', 'Age 41 - 65', 'Age Over 66'],
+                age_bucket + 1
+            ) AS age_group_enum) AS age_group,
+            COUNT(*) AS voted_count,
+            COUNT(*) FILTER (WHERE voted_county_desc != reg_county_desc) AS county_mismatches
+        FROM b
+        GROUP BY join_mismatch, reg_county_desc, party_cd, race_code, ethnic_code, sex_code, age_bucket
+        """,
+        [election_year],
+    )
+
     qa = con.execute(
         """
         SELECT
-            COUNT(*) AS total_voted,
-            COUNT(*) FILTER (WHERE reg_county_desc IS NULL) AS join_mismatches,
-            COUNT(*) FILTER (
-              WHERE reg_county_desc IS NOT NULL AND voted_county_desc != reg_county_desc
-            ) AS county_mismatches
-        FROM voted_joined
+            COALESCE(SUM(voted_count), 0) AS total_voted,
+            COALESCE(SUM(voted_count) FILTER (WHERE join_mismatch), 0) AS join_mismatches,
+            COALESCE(SUM(county_mismatches), 0) AS county_mismatches
+        FROM voted_grouped
         """
     ).fetchone()
 
     total_voted, join_mismatches, county_mismatches = qa
+    if not total_voted:
+        # Debug: nothing matched, so show which election labels do exist (costs another scan).
+        print("[DEBUG] sample election_lbl values:")
+        for row in con.execute(
+            f"""
+            SELECT election_lbl, COUNT(*) AS rows
+            FROM ({ncvhis_src})
+            GROUP BY 1
+            ORDER BY 1 DESC
+            LIMIT 15
+            """
+        ).fetchall():
+            print("   ", row[0], row[1])
+
     join_mismatch_rate = (join_mismatches / total_voted) if total_voted else 0.0
     county_mismatch_rate = ((county_mismatches) / (total_voted - join_mismatches)) if (total_voted - join_mismatches) else 0.0
 
@@ -275,7 +320,7 @@ def main():
     print(f"[INFO] join mismatches (dropped): {join_mismatches:,} ({join_mismatch_rate*100:.2f}%)")
     print(f"[INFO] county mismatches (kept, but county uses reg_county): {county_mismatches:,} ({county_mismatch_rate*100:.2f}%)")
 
-    # Save mismatch lists
+    # Save mismatch lists (only the mismatched rows leave the view)
     mismatch_ncids_path = Path(args.qa_dir) / f"mismatched_ncids_{election_iso}.csv"
     con.execute(
         """
@@ -323,52 +368,8 @@ def main():
         [str(qa_summary_path)],
     )
     # -----------------------
-    # 5) Clean voted + compute age_group aligned to voter_stats bins
-    #    Use reg_county_desc for county bucket.
+    # 5) Numerator: the aggregated buckets that found a voter record
     # -----------------------
-    con.execute("DROP TABLE IF EXISTS voted_clean;")
-    con.execute(
-        """
-        CREATE TABLE voted_clean AS
-        SELECT
-            reg_county_desc AS county_desc,
-            party_cd,
-            race_code,
-            ethnic_code,
-            sex_code,
-            birth_year
-        FROM voted_joined
-        WHERE reg_county_desc IS NOT NULL
-        """
-    )
-
-    con.execute("DROP TABLE IF EXISTS voted_with_age;")
-    con.execute(
-        """
-        CREATE TABLE voted_with_age AS
-        SELECT
-            county_desc,
-            party_cd,
-            race_code,
-            ethnic_code,
-            sex_code,
-            CASE
-                WHEN birth_year IS NULL OR length(trim(birth_year)) = 0 THEN 'Age < 18 Or Invalid Birth Dates'
-                WHEN TRY_CAST(trim(birth_year) AS INTEGER) IS NULL THEN 'Age < 18 Or Invalid Birth Dates'
-                ELSE
-                    CASE
-                        WHEN (? - CAST(trim(birth_year) AS INTEGER)) < 18 THEN 'Age < 18 Or Invalid Birth Dates'
-                        WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 18 AND 25 THEN 'Age 18 - 25'
-                        WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 26 AND 40 THEN 'Age 26 - 40'
-                        WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 41 AND 65 THEN 'Age 41 - 65'
-                        ELSE 'Age Over 66'
-                    END
-            END AS age_group
-        FROM voted_clean
-        """,
-        [election_year, election_year, election_year, election_year],
-    )
-
     con.execute("DROP TABLE IF EXISTS voted_aggregated;")
     con.execute(
         """
@@ -381,28 +382,29 @@ def main():
             ethnic_code,
             sex_code,
             age_group,
-            COUNT(*) AS voted_count
-        FROM voted_with_age
-        GROUP BY 1,2,3,4,5,6,7
+            voted_count
+        FROM voted_grouped
+        WHERE NOT join_mismatch
         """,
         [election_iso],
     )
-    va = con.execute("SELECT COUNT(*) FROM voted_aggregated").fetchone()[0]
-    print(f"[CHECK] voted_aggregated rows: {va:,}")
-
-    # how many rows match between denominator and numerator on the full key?
-    matches = con.execute("""
-    SELECT COUNT(*)
-    FROM voter_stats_denominator d
-    JOIN voted_aggregated v
-    ON d.election_date = v.election_date
-    AND d.county_desc = v.county_desc
+    # Numerator-side checks in one pass: every voted bucket, probed once against the denominator.
+    # The denominator key is unique, so each bucket matches at most one row.
+    va, matches, missing_votes = con.execute("""
+    SELECT
+    COUNT(*) AS va,
+    COUNT(d.county_desc) AS matches,
+    SUM(v.voted_count) FILTER (WHERE d.county_desc IS NULL) AS missing_votes
+    FROM voted_aggregated v
+    LEFT JOIN voter_stats_denominator d
+    ON d.county_desc = v.county_desc
     AND d.party_cd = v.party_cd
     AND d.race_code = v.race_code
     AND d.ethnic_code = v.ethnic_code
     AND d.sex_code = v.sex_code
     AND d.age_group = v.age_group
-    """).fetchone()[0]
+    """).fetchone()
+    print(f"[CHECK] voted_aggregated rows: {va:,}")
     print(f"[CHECK] exact key matches between denominator and voted_aggregated: {matches:,}")
 
     # -----------------------
@@ -428,8 +430,8 @@ def main():
             END AS turnout_rate
         FROM voter_stats_denominator d
         LEFT JOIN voted_aggregated v
-          ON d.election_date = v.election_date
-         AND d.county_desc = v.county_desc
+          -- both sides hold a single election_date, so it is not part of the key
+          ON d.county_desc = v.county_desc
          AND d.party_cd = v.party_cd
          AND d.race_code = v.race_code
          AND d.ethnic_code = v.ethnic_code
@@ -457,34 +459,18 @@ def main():
         """,
         [args.out_csv],
     )
-    statewide = con.execute("""
+    # Bucket-side checks, again one scan of turnout_buckets.
+    voted, registered, turnout, bad = con.execute("""
     SELECT
     SUM(voted_count) AS voted,
     SUM(registered_count) AS registered,
-    SUM(voted_count) * 1.0 / NULLIF(SUM(registered_count), 0) AS turnout
+    SUM(voted_count) * 1.0 / NULLIF(SUM(registered_count), 0) AS turnout,
+    COUNT(*) FILTER (WHERE registered_count = 0) AS bad
     FROM turnout_buckets
     """).fetchone()
 
-    print(f"[CHECK] statewide voted={statewide[0]:,} registered={statewide[1]:,} turnout={statewide[2]:.4f}")
-    
-    bad = con.execute("""
-    SELECT COUNT(*) FROM turnout_buckets WHERE registered_count = 0
-    """).fetchone()[0]
+    print(f"[CHECK] statewide voted={voted:,} registered={registered:,} turnout={turnout:.4f}")
     print(f"[CHECK] buckets with registered_count=0: {bad}")
-    
-    missing_votes = con.execute("""
-    SELECT SUM(v.voted_count) 
-    FROM voted_aggregated v
-    LEFT JOIN voter_stats_denominator d
-    ON d.election_date = v.election_date
-    AND d.county_desc = v.county_desc
-    AND d.party_cd = v.party_cd
-    AND d.race_code = v.race_code
-    AND d.ethnic_code = v.ethnic_code
-    AND d.sex_code = v.sex_code
-    AND d.age_group = v.age_group
-    WHERE d.county_desc IS NULL
-    """).fetchone()[0]
     print(f"[CHECK] voted_aggregated counts with no denominator match: {missing_votes}")
 
     print(f"[OK] wrote: {args.out_csv}")
@@ -4,7 +4,8 @@ import argparse
 import os
 import glob
 from pathlib import Path
-import duckdb
+
+from nc_sources import connect, ncvhis_cache, ncvhis_scan, ncvoter_attrs_cache, sql_string
 
 def yyyymmdd_to_mmddyyyy(s: str) -> str:
     # "20251104" -> "11/04/2025"
@@ -17,14 +18,38 @@ def mmddyyyy_to_iso(mmddyyyy: str) -> str:
     m, d, y = mmddyyyy.split("/")
     return f"{y}-{m.zfill(2)}-{d.zfill(2)}"
 
+def is_turnout_parquet_dir(path: Path) -> bool:
+    # True for an empty directory or one holding nothing but a previous --out_parquet export
+    return path.is_dir() and all(
+        part.is_dir()
+        and part.name.startswith("election_date=")
+        and all(f.is_file() and f.suffix == ".parquet" for f in part.iterdir())
+        for part in path.iterdir()
+    )
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--ncvhis", default="data/raw/ncvhis/ncvhis_Statewide.txt")
     ap.add_argument("--ncvoter", default="data/raw/ncvoter/ncvoter_Statewide.txt")
     ap.add_argument("--voter_stats_glob", default="data/raw/voter_stats/voter_stats_*.txt")
     ap.add_argument("--out_csv", default="web/src/data/county_demographic_turnout_all.csv")
-    ap.add_argument("--db_path", default="data/derived/nc_turnout.duckdb")
+    ap.add_argument(
+        "--out_parquet",
+        default=None,
+        help="also write the combined table as Parquet, one partition directory per election_date",
+    )
+    ap.add_argument(
+        "--db_path",
+        default=None,
+        help="keep qa_all_tmp in this DuckDB file for debugging; by default the build runs in memory",
+    )
     ap.add_argument("--qa_dir", default="data/derived/qa")
+    ap.add_argument("--temp_dir", default="data/derived/tmp", help="where DuckDB spills hash tables that exceed memory")
+    ap.add_argument(
+        "--cache_dir",
+        default="data/derived/cache",
+        help="Parquet copies of the cleaned ncvhis/ncvoter tables; rebuilt when the source file is newer",
+    )
     args = ap.parse_args()
 
     voter_stats_files = sorted(glob.glob(args.voter_stats_glob))
@@ -34,130 +59,127 @@ def main():
             "Expected files like voter_stats_YYYYMMDD.txt"
         )
 
+    # The Parquet export replaces its directory wholesale (COPY ... OVERWRITE), so refuse any
+    # directory that holds anything besides an earlier export before doing any work.
+    if args.out_parquet and Path(args.out_parquet).exists() and not is_turnout_parquet_dir(Path(args.out_parquet)):
+        raise SystemExit(
+            f"--out_parquet {args.out_parquet} exists and is not a previous turnout export; "
+            "pick an empty or new directory"
+        )
+
     Path(args.qa_dir).mkdir(parents=True, exist_ok=True)
+    Path(args.cache_dir).mkdir(parents=True, exist_ok=True)
+    Path(args.temp_dir).mkdir(parents=True, exist_ok=True)
     Path(os.path.dirname(args.out_csv)).mkdir(parents=True, exist_ok=True)
-    Path(os.path.dirname(args.db_path)).mkdir(parents=True, exist_ok=True)
-
-    con = duckdb.connect(database=args.db_path)
-    con.execute("PRAGMA threads=4;")
-    con.execute("PRAGMA enable_progress_bar=true;")
+    if args.db_path:
+        Path(os.path.dirname(args.db_path)).mkdir(parents=True, exist_ok=True)
+
+    # A one-shot build: only the COPY outputs need to reach disk, so by default nothing is
+    # logged or checkpointed and the whole memory budget goes to joins and aggregates.
+    con = connect(args.db_path or ":memory:")
+    # memory_limit is left at DuckDB's default (80% of RAM); spills past it go to local disk
+    con.execute("SET temp_directory = ?;", [args.temp_dir])
+
+    # Every intermediate below is a TEMP table or view, and the turnout rows stream straight
+    # into the output files; only qa_all_tmp lands in --db_path when one is given.
+    if args.db_path:
+        # TEMP objects shadow same-named tables that build_demographic_turnout.py keeps in a
+        # shared database; the ones only this script used to persist are dropped here.
+        for old in (
+            "ncvhis_raw", "ncvhis_election", "voted_ncids", "voted_joined", "voted_joined_all",
+            "voted_clean", "voted_with_age", "voter_stats_raw", "age_map", "turnout_all",
+        ):
+            con.execute(f"DROP TABLE IF EXISTS {old};")
+        con.execute("DROP TYPE IF EXISTS county_enum;")
 
     # ------------------------------------------------------------
     # 0) Load core tables ONCE (ncvhis_raw, ncvoter_attrs)
     # ------------------------------------------------------------
-    con.execute("DROP TABLE IF EXISTS ncvhis_raw;")
+    # The TSVs are parsed and cleaned once into the shared Parquet caches (nc_sources.py), and
+    # both tables are views over those copies, so the queries below are columnar scans instead of
+    # re-tokenizing the TSVs. History is partitioned by election_lbl, so the numerator scan
+    # only opens the target elections' files. County names were upper-cased in the cache build
+    # and stay VARCHAR: at 12 bytes or less they are stored inline, and an ENUM cast measured no
+    # faster.
+    ncvhis_path = ncvhis_cache(con, args.ncvhis, args.cache_dir)
+    ncvoter_path = ncvoter_attrs_cache(con, args.ncvoter, args.cache_dir)
+    con.execute(f"CREATE OR REPLACE TEMP VIEW ncvhis_raw AS SELECT * FROM {ncvhis_scan(ncvhis_path)}")
     con.execute(
-        """
-        CREATE TABLE ncvhis_raw AS
-        SELECT
-            replace(trim(column3), '"', '') AS election_lbl,
-            replace(trim(column10), '"', '') AS ncid,
-            upper(replace(trim(column1), '"', '')) AS county_desc
-        FROM read_csv(
-            ?, delim='\\t', header=false, quote='', escape='',
-            strict_mode=false, ignore_errors=true, null_padding=true, max_line_size=10000000,
-            columns={
-                'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
-                'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
-                'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR',
-                'column12':'VARCHAR','column13':'VARCHAR','column14':'VARCHAR'
-            }
-        )
-        WHERE election_lbl IS NOT NULL
-          AND length(trim(election_lbl)) > 0
-          AND lower(trim(election_lbl)) != 'election_lbl'
-          AND ncid IS NOT NULL
-          AND length(trim(ncid)) > 0
-          AND lower(trim(ncid)) != 'ncid'
-        """,
-        [args.ncvhis],
+        f"CREATE OR REPLACE TEMP VIEW ncvoter_attrs AS SELECT * FROM read_parquet({sql_string(ncvoter_path)})"
     )
 
-    con.execute("DROP TABLE IF EXISTS ncvoter_attrs;")
+    # voter_stats age_group labels <-> the TINYINT bucket the numerator is grouped on
     con.execute(
         """
-        CREATE TABLE ncvoter_attrs AS
-        SELECT
-            replace(trim(column3), '"', '') AS ncid,
-            upper(replace(trim(column1), '"', '')) AS reg_county_desc,
-            replace(trim(column28), '"', '') AS party_cd,
-            replace(trim(column26), '"', '') AS race_code,
-            replace(trim(column27), '"', '') AS ethnic_code,
-            replace(trim(column29), '"', '') AS sex_code,
-            replace(trim(column30), '"', '') AS birth_year
-        FROM read_csv(
-            ?, delim='\\t', header=false, quote='', escape='',
-            strict_mode=false, ignore_errors=true, null_padding=true, max_line_size=10000000,
-            columns={
-                'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
-                'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
-                'column8':'VARCHAR','column9':'VARCHAR','column10':'VARCHAR','column11':'VARCHAR',
-                'column12':'VARCHAR','column13':'VARCHAR','column14':'VARCHAR','column15':'VARCHAR',
-                'column16':'VARCHAR','column17':'VARCHAR','column18':'VARCHAR','column19':'VARCHAR',
-                'column20':'VARCHAR','column21':'VARCHAR','column22':'VARCHAR','column23':'VARCHAR',
-                'column24':'VARCHAR','column25':'VARCHAR','column26':'VARCHAR','column27':'VARCHAR',
-                'column28':'VARCHAR','column29':'VARCHAR','column30':'VARCHAR','column31':'VARCHAR',
-                'column32':'VARCHAR','column33':'VARCHAR','column34':'VARCHAR','column35':'VARCHAR',
-                'column36':'VARCHAR','column37':'VARCHAR','column38':'VARCHAR','column39':'VARCHAR',
-                'column40':'VARCHAR','column41':'VARCHAR','column42':'VARCHAR','column43':'VARCHAR',
-                'column44':'VARCHAR','column45':'VARCHAR','column46':'VARCHAR','column47':'VARCHAR',
-                'column48':'VARCHAR','column49':'VARCHAR','column50':'VARCHAR','column51':'VARCHAR',
-                'column52':'VARCHAR','column53':'VARCHAR','column54':'VARCHAR','column55':'VARCHAR',
-                'column56':'VARCHAR','column57':'VARCHAR','column58':'VARCHAR','column59':'VARCHAR',
-                'column60':'VARCHAR','column61':'VARCHAR','column62':'VARCHAR','column63':'VARCHAR',
-                'column64':'VARCHAR','column65':'VARCHAR','column66':'VARCHAR'
-            }
-        )
-        WHERE ncid IS NOT NULL AND length(trim(ncid)) > 0 AND lower(trim(ncid)) != 'ncid'
-        """,
-        [args.ncvoter],
+        CREATE TEMP TABLE age_map AS
+        SELECT age_group, age_bucket::TINYINT AS age_bucket
+        FROM (VALUES
+            ('Age < 18 Or Invalid Birth Dates', 0),
+            ('Age 18 - 25', 1),
+            ('Age 26 - 40', 2),
+            ('Age 41 - 65', 3),
+            ('Age Over 66', 4)
+        ) AS m(age_group, age_bucket)
+        """
     )
 
-    # Output table that accumulates all elections
-    con.execute("DROP TABLE IF EXISTS turnout_all;")
+    # QA summary across elections, filled from SQL in one INSERT
+    con.execute("DROP TABLE IF EXISTS qa_all_tmp;")
     con.execute(
         """
-        CREATE TABLE turnout_all (
+        CREATE TABLE qa_all_tmp (
             election_date VARCHAR,
-            county_desc VARCHAR,
-            party_cd VARCHAR,
-            race_code VARCHAR,
-            ethnic_code VARCHAR,
-            sex_code VARCHAR,
-            age_group VARCHAR,
-            registered_count BIGINT,
-            voted_count BIGINT,
-            turnout_rate DOUBLE
+            election_lbl VARCHAR,
+            total_voted_ncids BIGINT,
+            join_mismatches_dropped BIGINT,
+            join_mismatch_rate DOUBLE,
+            county_mismatches_kept BIGINT,
+            county_mismatch_rate DOUBLE
         );
         """
     )
 
-    qa_rows = []
-
-    # ------------------------------------------------------------
-    # 1) Loop elections from voter_stats files
-    # ------------------------------------------------------------
+    # Elections to build, one per voter_stats_YYYYMMDD.txt
+    election_files = []
+    elections = []
     for voter_stats_path in voter_stats_files:
-
-        # expects .../voter_stats_YYYYMMDD.txt
         base = Path(voter_stats_path).name
         yyyymmdd = base.replace("voter_stats_", "").replace(".txt", "")
         if len(yyyymmdd) != 8 or not yyyymmdd.isdigit():
             print(f"[WARN] skipping unrecognized file name: {base}")
             continue
-
         election_mmddyyyy = yyyymmdd_to_mmddyyyy(yyyymmdd)
         election_iso = mmddyyyy_to_iso(election_mmddyyyy)
-        election_year = int(election_iso.split("-")[0])
+        election_files.append(voter_stats_path)
+        elections.append(
+            {
+                "yyyymmdd": yyyymmdd,
+                "election_lbl": election_mmddyyyy,
+                "election_date": election_iso,
+                "election_year": int(election_iso.split("-")[0]),
+                "source_file": base,
+            }
+        )
+    if not elections:
+        raise SystemExit(f"No voter_stats file under {args.voter_stats_glob} is named like voter_stats_YYYYMMDD.txt")
 
-        print(f"\n[INFO] building election {election_iso} from {base}")
+    # The per-election constants, computed once here; the SQL below joins them instead of
+    # binding them election by election.
+    con.execute("CREATE OR REPLACE TEMP TABLE election_meta AS SELECT UNNEST(?, recursive := true);", [elections])
 
-        # --- Denominator from voter_stats_YYYYMMDD.txt
-        con.execute("DROP TABLE IF EXISTS voter_stats_raw;")
-        con.execute(
-            """
-            CREATE TABLE voter_stats_raw AS
+    # ------------------------------------------------------------
+    # 1) Denominators for ALL elections in one scan
+    # ------------------------------------------------------------
+    # The multi-file reader scans every voter_stats file in parallel; the election each row
+    # belongs to comes from its file name (voter_stats_YYYYMMDD.txt), matched to election_meta.
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE voter_stats_denominator AS
+        WITH voter_stats_raw AS (
             SELECT
+                regexp_extract(filename, 'voter_stats_(\\d{8})\\.txt$', 1) AS yyyymmdd,
+                -- quote='' with the quotes stripped in SQL: a stray quote in a precinct name cannot
+                -- break the parse, and "" stays '' so an empty code can match the numerator
                 upper(replace(trim(column0), '"', '')) AS county_desc,
                 replace(trim(column1), '"', '') AS election_date_raw,
                 replace(trim(column2), '"', '') AS stats_type,
@@ -168,7 +190,7 @@ def main():
                 replace(trim(column9), '"', '') AS age_group,
                 TRY_CAST(replace(trim(column10), '"', '') AS BIGINT) AS total_voters
             FROM read_csv(
-                ?, delim='\\t', header=false, quote='', escape='',
+                ?, delim='\\t', header=false, quote='', escape='', auto_detect=false, filename=true,
                 columns={
                     'column0':'VARCHAR','column1':'VARCHAR','column2':'VARCHAR','column3':'VARCHAR',
                     'column4':'VARCHAR','column5':'VARCHAR','column6':'VARCHAR','column7':'VARCHAR',
@@ -176,198 +198,186 @@ def main():
                 }
             )
             WHERE TRY_CAST(replace(trim(column10), '"', '') AS BIGINT) IS NOT NULL
-            """,
-            [voter_stats_path],
-        )
-
-        con.execute("DROP TABLE IF EXISTS voter_stats_denominator;")
-        con.execute(
-            """
-            CREATE TABLE voter_stats_denominator AS
-            SELECT
-                ? AS election_date,
-                county_desc,
-                party_cd,
-                race_code,
-                ethnic_code,
-                sex_code,
-                age_group,
-                SUM(total_voters) AS registered_count
-            FROM voter_stats_raw
-            WHERE election_date_raw = ?
-              AND lower(stats_type) = 'voter'
-            GROUP BY 1,2,3,4,5,6,7
-            """,
-            [election_iso, election_mmddyyyy],
         )
+        SELECT
+            m.election_date,
+            county_desc,
+            party_cd,
+            race_code,
+            ethnic_code,
+            sex_code,
+            age_group,
+            SUM(total_voters)::BIGINT AS registered_count -- not HUGEINT, which Parquet stores as DOUBLE
+        FROM voter_stats_raw r
+        JOIN election_meta m
+          ON r.yyyymmdd = m.yyyymmdd
+        WHERE r.election_date_raw = m.election_lbl
+          AND lower(stats_type) = 'voter'
+        GROUP BY 1,2,3,4,5,6,7
+        """,
+        [election_files],
+    )
 
-        # --- Numerator: voters who voted in election (dedupe NCID)
-        con.execute("DROP TABLE IF EXISTS ncvhis_election;")
-        con.execute(
-            """
-            CREATE TABLE ncvhis_election AS
+    # ------------------------------------------------------------
+    # 2) Numerator + QA counts for ALL elections in one pass
+    # ------------------------------------------------------------
+    # ncvhis is scanned, deduped and joined to ncvoter_attrs once for every target election,
+    # and the join, age bucketing and GROUP BY run as a single pipeline, so the joined voter
+    # rows are never materialized. Voters that found no voter record are kept as their own
+    # group (join_mismatch), and county mismatches are counted per group, so the QA summary
+    # below comes out of this same scan.
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE voted_grouped AS
+        WITH ncvhis_election AS (
             SELECT county_desc, election_lbl, ncid
             FROM ncvhis_raw
-            WHERE election_lbl = ?
-            """,
-            [election_mmddyyyy],
-        )
-
-        con.execute("DROP TABLE IF EXISTS voted_ncids;")
-        con.execute(
-            """
-            CREATE TABLE voted_ncids AS
+            WHERE list_contains(?, election_lbl) -- constant list, so partitions are pruned at plan time
+        ),
+        voted_ncids AS (
+            -- dedupe NCID within each election; min() keeps the alphabetically first county
+            -- (same pick as ORDER BY county_desc) with a plain hash aggregate, no window sort
             SELECT
-                county_desc AS voted_county_desc,
+                election_lbl,
+                min(county_desc) AS voted_county_desc,
                 ncid
-            FROM (
-                SELECT county_desc, ncid,
-                       row_number() OVER (PARTITION BY ncid ORDER BY county_desc) AS rn
-                FROM ncvhis_election
-            )
-            WHERE rn = 1
-            """
-        )
-
-        con.execute("DROP TABLE IF EXISTS voted_joined;")
-        con.execute(
-            """
-            CREATE TABLE voted_joined AS
+            FROM ncvhis_election
+            GROUP BY election_lbl, ncid
+        ),
+        t AS (
+            -- age is computed once per row; birth_year is a SMALLINT that the ncvoter_attrs cache
+            -- already set to NULL for missing, blank and non-numeric years
             SELECT
+                m.election_date,
+                a.reg_county_desc IS NULL AS join_mismatch,
                 v.voted_county_desc,
-                a.reg_county_desc,
-                v.ncid,
+                a.reg_county_desc AS county_desc,
                 a.party_cd,
                 a.race_code,
                 a.ethnic_code,
                 a.sex_code,
-                a.birth_year
+                m.election_year - a.birth_year AS age
             FROM voted_ncids v
+            JOIN election_meta m
+              ON v.election_lbl = m.election_lbl
             LEFT JOIN ncvoter_attrs a
               ON v.ncid = a.ncid
-            """
         )
+        SELECT
+            election_date,
+            join_mismatch,
+            county_desc,
+            party_cd,
+            race_code,
+            ethnic_code,
+            sex_code,
+            -- bucket ids as in age_map
+            CASE
+                WHEN age IS NULL OR age < 18 THEN 0
+                WHEN age <= 25 THEN 1
+                WHEN age <= 40 THEN 2
+                WHEN age <= 65 THEN 3
+                ELSE 4
+            END::TINYINT AS age_bucket,
+            COUNT(*) AS voted_count,
+            COUNT(*) FILTER (WHERE voted_county_desc != county_desc) AS county_mismatches
+        FROM t
+        GROUP BY 1,2,3,4,5,6,7,8
+        """,
+        [[e["election_lbl"] for e in elections]],
+    )
 
-        qa = con.execute(
-            """
-            SELECT
-                COUNT(*) AS total_voted,
-                COUNT(*) FILTER (WHERE reg_county_desc IS NULL) AS join_mismatches,
-                COUNT(*) FILTER (
-                  WHERE reg_county_desc IS NOT NULL AND voted_county_desc != reg_county_desc
-                ) AS county_mismatches
-            FROM voted_joined
-            """
-        ).fetchone()
-
-        total_voted, join_mismatches, county_mismatches = qa
-        join_mismatch_rate = (join_mismatches / total_voted) if total_voted else 0.0
-        county_mismatch_rate = ((county_mismatches) / (total_voted - join_mismatches)) if (total_voted - join_mismatches) else 0.0
+    # Join mismatches are dropped from the numerator
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP VIEW voted_aggregated AS
+        SELECT election_date, county_desc, party_cd, race_code, ethnic_code, sex_code, age_bucket, voted_count
+        FROM voted_grouped
+        WHERE NOT join_mismatch
+        """
+    )
 
+    # ------------------------------------------------------------
+    # 3) QA summary for ALL elections from the grouped counts
+    # ------------------------------------------------------------
+    qa_rows = con.execute(
+        """
+        INSERT INTO qa_all_tmp
+        SELECT
+            election_date,
+            election_lbl,
+            total_voted,
+            join_mismatches,
+            COALESCE(join_mismatches / NULLIF(total_voted, 0), 0.0),
+            county_mismatches,
+            COALESCE(county_mismatches / NULLIF(total_voted - join_mismatches, 0), 0.0)
+        FROM (
+            SELECT
+                m.election_date,
+                m.election_lbl,
+                COALESCE(SUM(g.voted_count), 0)::BIGINT AS total_voted,
+                COALESCE(SUM(g.voted_count) FILTER (WHERE g.join_mismatch), 0)::BIGINT AS join_mismatches,
+                COALESCE(SUM(g.county_mismatches), 0)::BIGINT AS county_mismatches
+            FROM election_meta m
+            LEFT JOIN voted_grouped g
+              ON g.election_date = m.election_date
+            GROUP BY 1,2
+        )
+        RETURNING
+            election_date,
+            total_voted_ncids,
+            join_mismatches_dropped,
+            join_mismatch_rate,
+            county_mismatches_kept,
+            county_mismatch_rate
+        """
+    ).fetchall()
+    qa_by_election = {row[0]: row[1:] for row in qa_rows}
+
+    for e in elections:
+        total_voted, join_mismatches, join_mismatch_rate, county_mismatches, county_mismatch_rate = qa_by_election[
+            e["election_date"]
+        ]
+        print(f"\n[INFO] building election {e['election_date']} from {e['source_file']}")
         print(f"[INFO] voted (deduped ncid): {total_voted:,}")
         print(f"[INFO] join mismatches: {join_mismatches:,} ({join_mismatch_rate*100:.2f}%)")
         print(f"[INFO] county mismatches: {county_mismatches:,} ({county_mismatch_rate*100:.2f}%)")
 
-        qa_rows.append((election_iso, election_mmddyyyy, total_voted, join_mismatches, join_mismatch_rate, county_mismatches, county_mismatch_rate))
-
-        # --- Age bucket + aggregate
-        con.execute("DROP TABLE IF EXISTS voted_clean;")
-        con.execute(
-            """
-            CREATE TABLE voted_clean AS
-            SELECT
-                reg_county_desc AS county_desc,
-                party_cd,
-                race_code,
-                ethnic_code,
-                sex_code,
-                birth_year
-            FROM voted_joined
-            WHERE reg_county_desc IS NOT NULL
-            """
-        )
-
-        con.execute("DROP TABLE IF EXISTS voted_with_age;")
-        con.execute(
-            """
-            CREATE TABLE voted_with_age AS
-            SELECT
-                county_desc,
-                party_cd,
-                race_code,
-                ethnic_code,
-                sex_code,
-                CASE
-                    WHEN birth_year IS NULL OR length(trim(birth_year)) = 0 THEN 'Age < 18 Or Invalid Birth Dates'
-                    WHEN TRY_CAST(trim(birth_year) AS INTEGER) IS NULL THEN 'Age < 18 Or Invalid Birth Dates'
-                    ELSE
-                        CASE
-                            WHEN (? - CAST(trim(birth_year) AS INTEGER)) < 18 THEN 'Age < 18 Or Invalid Birth Dates'
-                            WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 18 AND 25 THEN 'Age 18 - 25'
-                            WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 26 AND 40 THEN 'Age 26 - 40'
-                            WHEN (? - CAST(trim(birth_year) AS INTEGER)) BETWEEN 41 AND 65 THEN 'Age 41 - 65'
-                            ELSE 'Age Over 66'
-                        END
-                END AS age_group
-            FROM voted_clean
-            """,
-            [election_year, election_year, election_year, election_year],
-        )
-
-        con.execute("DROP TABLE IF EXISTS voted_aggregated;")
-        con.execute(
-            """
-            CREATE TABLE voted_aggregated AS
-            SELECT
-                ? AS election_date,
-                county_desc,
-                party_cd,
-                race_code,
-                ethnic_code,
-                sex_code,
-                age_group,
-                COUNT(*) AS voted_count
-            FROM voted_with_age
-            GROUP BY 1,2,3,4,5,6,7
-            """,
-            [election_iso],
-        )
-
-        # --- Join numerator/denominator and append to turnout_all
-        con.execute("DROP TABLE IF EXISTS turnout_buckets;")
-        con.execute(
-            """
-            CREATE TABLE turnout_buckets AS
-            SELECT
-                d.election_date,
-                d.county_desc,
-                d.party_cd,
-                d.race_code,
-                d.ethnic_code,
-                d.sex_code,
-                d.age_group,
-                d.registered_count,
-                COALESCE(v.voted_count, 0) AS voted_count,
-                CASE WHEN d.registered_count = 0 THEN NULL
-                     ELSE (COALESCE(v.voted_count, 0) * 1.0 / d.registered_count)
-                END AS turnout_rate
-            FROM voter_stats_denominator d
-            LEFT JOIN voted_aggregated v
-              ON d.election_date = v.election_date
-             AND d.county_desc = v.county_desc
-             AND d.party_cd = v.party_cd
-             AND d.race_code = v.race_code
-             AND d.ethnic_code = v.ethnic_code
-             AND d.sex_code = v.sex_code
-             AND d.age_group = v.age_group
-            """
-        )
-
-        con.execute("INSERT INTO turnout_all SELECT * FROM turnout_buckets;")
-
     # ------------------------------------------------------------
-    # 2) Export combined CSV
+    # 4) Join numerator/denominator and export
     # ------------------------------------------------------------
+    # A view, so each export runs the join inline and no turnout table is ever written.
+    con.execute(
+        """
+        CREATE OR REPLACE TEMP VIEW turnout_buckets AS
+        SELECT
+            d.election_date,
+            d.county_desc,
+            d.party_cd,
+            d.race_code,
+            d.ethnic_code,
+            d.sex_code,
+            d.age_group,
+            d.registered_count,
+            COALESCE(v.voted_count, 0) AS voted_count,
+            CASE WHEN d.registered_count = 0 THEN NULL
+                 ELSE (COALESCE(v.voted_count, 0) * 1.0 / d.registered_count)
+            END AS turnout_rate
+        FROM voter_stats_denominator d
+        -- labels outside age_map get no bucket, so they never match a vote (as before)
+        LEFT JOIN age_map m
+          ON d.age_group = m.age_group
+        LEFT JOIN voted_aggregated v
+          ON d.election_date = v.election_date
+         AND d.county_desc = v.county_desc
+         AND d.party_cd = v.party_cd
+         AND d.race_code = v.race_code
+         AND d.ethnic_code = v.ethnic_code
+         AND d.sex_code = v.sex_code
+         AND m.age_bucket = v.age_bucket
+        """
+    )
+
     con.execute(
         """
         COPY (
@@ -382,7 +392,7 @@ def main():
                 registered_count,
                 voted_count,
                 turnout_rate
-            FROM turnout_all
+            FROM turnout_buckets
             ORDER BY election_date, county_desc, party_cd, race_code, ethnic_code, sex_code, age_group
         ) TO ? (HEADER, DELIMITER ',')
         """,
@@ -390,24 +400,20 @@ def main():
     )
     print(f"\n[OK] wrote combined: {args.out_csv}")
 
-    # Optional QA summary across elections
+    # The web app imports the CSV as text, so it keeps the global ORDER BY (stable diffs too).
+    # The Parquet copy needs no sort: each election lands in its own partition.
+    if args.out_parquet:
+        con.execute(
+            """
+            COPY turnout_buckets TO ? (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (election_date), OVERWRITE)
+            """,
+            [args.out_parquet],
+        )
+        print(f"[OK] wrote combined Parquet: {args.out_parquet}")
+
+    # QA summary across elections
     qa_path = Path(args.qa_dir) / "qa_summary_ALL.csv"
-    con.execute("DROP TABLE IF EXISTS qa_all_tmp;")
-    con.execute(
-        """
-        CREATE TABLE qa_all_tmp (
-            election_date VARCHAR,
-            election_lbl VARCHAR,
-            total_voted_ncids BIGINT,
-            join_mismatches_dropped BIGINT,
-            join_mismatch_rate DOUBLE,
-            county_mismatches_kept BIGINT,
-            county_mismatch_rate DOUBLE
-        );
-        """
-    )
-    con.executemany("INSERT INTO qa_all_tmp VALUES (?, ?, ?, ?, ?, ?, ?)", qa_rows)
-    con.execute("COPY qa_all_tmp TO ? (HEADER, DELIMITER ',')", [str(qa_path)])
+    con.execute("COPY (SELECT * FROM qa_all_tmp ORDER BY election_date) TO ? (HEADER, DELIMITER ',')", [str(qa_path)])
     print(f"[OK] wrote QA: {qa_path}")
 
 if __name__ == "__main__":
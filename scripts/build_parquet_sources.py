@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from nc_sources import connect, ncvhis_cache, ncvoter_attrs_cache
+
+
+def main():
+    # Builds the NCVHIS/NCVoter Parquet caches ahead of time. Either build script creates
+    # them on first use anyway; this just moves the one-time TSV parse out of the first build.
+    # The defaults match build_demographic_turnout_all.py; build_demographic_turnout.py defaults
+    # to data/raw/ncvhis_Statewide.txt etc., so pass it the same --ncvhis/--ncvoter as here.
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--ncvhis",
+        default="data/raw/ncvhis/ncvhis_Statewide.txt",
+        help="the cache is keyed by this path, so the builds only reuse it when given the same --ncvhis",
+    )
+    ap.add_argument(
+        "--ncvoter",
+        default="data/raw/ncvoter/ncvoter_Statewide.txt",
+        help="the cache is keyed by this path, so the builds only reuse it when given the same --ncvoter",
+    )
+    ap.add_argument("--cache_dir", default="data/derived/cache", help="must match the builds' --cache_dir")
+    args = ap.parse_args()
+
+    Path(args.cache_dir).mkdir(parents=True, exist_ok=True)
+    con = connect(":memory:")
+
+    print(f"[OK] ncvhis: {ncvhis_cache(con, args.ncvhis, args.cache_dir)}")
+    print(f"[OK] ncvoter attributes: {ncvoter_attrs_cache(con, args.ncvoter, args.cache_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+import duckdb
+
+# Shared by the build scripts: the one place the statewide NCVHIS/NCVoter TSVs are parsed and
+# cleaned. Each is converted once into a Parquet copy under the cache directory, rebuilt only
+# when the source file is newer, and every build reads that copy.
+
+# ncvhis has 15 tab-separated columns and ncvoter 67; declare them all so positions line up,
+# and let projection pushdown decode only the handful each query selects.
+NCVHIS_COLUMNS = {f"column{i}": "VARCHAR" for i in range(15)}
+NCVOTER_COLUMNS = {f"column{i}": "VARCHAR" for i in range(67)}
+
+
+def connect(database: str):
+    con = duckdb.connect(database=database)
+    con.execute(f"PRAGMA threads={os.cpu_count() or 4};")
+    # nothing in the builds depends on row order unless it says ORDER BY
+    con.execute("PRAGMA preserve_insertion_order=false;")
+    con.execute("PRAGMA enable_progress_bar=true;")
+    return con
+
+
+def cache_is_fresh(cache_path: Path, source_path: str) -> bool:
+    # A cached Parquet copy is reused only while it is newer than the file it was built from.
+    return cache_path.exists() and cache_path.stat().st_mtime >= os.path.getmtime(source_path)
+
+
+def cache_path_for(cache_dir: str, prefix: str, source_path: str, suffix: str = "") -> Path:
+    # Cache entries are named after the source file's stem plus a short hash of its resolved
+    # path, so two different files with the same name never share an entry. Each prefix carries
+    # a _vN schema version: bump it whenever the SQL that builds that cache changes, so entries
+    # written by older code are never mistaken for fresh ones.
+    source = Path(source_path).resolve()
+    digest = hashlib.sha1(str(source).encode()).hexdigest()[:8]
+    return Path(cache_dir) / f"{prefix}_{source.stem}_{digest}{suffix}"
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def cache_staging_path(cache_path: Path) -> Path:
+    # Caches are written to a sibling path and moved into place by publish_cache() only once the
+    # write has finished, so a build killed mid-COPY never leaves a partial copy that the mtime
+    # check would take for fresh. Clears whatever an earlier killed write left there.
+    staging = cache_path.with_name(cache_path.name + ".tmp")
+    _remove(staging)
+    return staging
+
+
+def publish_cache(staging: Path, cache_path: Path) -> None:
+    _remove(cache_path)  # os.replace() cannot move a directory over a non-empty one
+    os.replace(staging, cache_path)
+
+
+def ncvhis_cache(con, ncvhis_path: str, cache_dir: str) -> Path:
+    # Voter history as (election_lbl, ncid, county_desc). Partitioned by election_lbl (hive
+    # layout, '/' is URL-encoded in the directory names), so a build that filters on the label
+    # only opens the target elections' files. Returns the directory; read it with ncvhis_scan().
+    # Read with quote='' like ncvoter: the free-text description columns can carry a stray
+    # quote, and with quoted parsing plus ignore_errors=true one of those would silently
+    # swallow the rows after it. The quotes are stripped in SQL instead.
+    cache_path = cache_path_for(cache_dir, "ncvhis_raw_v3", ncvhis_path)
+    if cache_is_fresh(cache_path, ncvhis_path):
+        print(f"[INFO] ncvhis from cache: {cache_path}")
+        return cache_path
+    staging = cache_staging_path(cache_path)
+    con.execute(
+        """
+        COPY (
+            SELECT
+                replace(trim(column3), '"', '') AS election_lbl,
+                replace(trim(column10), '"', '') AS ncid,
+                upper(replace(trim(column1), '"', '')) AS county_desc
+            FROM read_csv(
+                $src, delim='\\t', header=false, quote='', escape='', auto_detect=false,
+                strict_mode=false, ignore_errors=true, null_padding=true, max_line_size=10000000,
+                columns=$columns
+            )
+            WHERE election_lbl IS NOT NULL
+              AND length(election_lbl) > 0
+              AND lower(election_lbl) != 'election_lbl'
+              AND ncid IS NOT NULL
+              AND length(ncid) > 0
+              AND lower(ncid) != 'ncid'
+        ) TO $dest (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (election_lbl), OVERWRITE)
+        """,
+        {"src": ncvhis_path, "columns": NCVHIS_COLUMNS, "dest": str(staging)},
+    )
+    publish_cache(staging, cache_path)
+    return cache_path
+
+
+def sql_string(value) -> str:
+    # A path as a quoted SQL literal, for the few places that must inline one (a view cannot
+    # bind parameters); doubling the quotes keeps a path like /tmp/o'brien/cache intact.
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def ncvhis_scan(cache_path: Path) -> str:
+    # FROM-clause for the ncvhis cache. The path is inlined rather than bound so the scan can
+    # sit in a view; the label stays VARCHAR instead of being sniffed as a date.
+    return (
+        f"read_parquet({sql_string(cache_path / '**' / '*.parquet')}, hive_partitioning=true, "
+        "hive_types={'election_lbl': 'VARCHAR'})"
+    )
+
+
+def ncvoter_attrs_cache(con, ncvoter_path: str, cache_dir: str) -> Path:
+    # Only the voter attributes the builds join on. ncvoter is read with quote='': its free-text
+    # name and address columns can carry stray quotes, and with ignore_errors=true one of those
+    # would silently drop a voter row, so the quotes are stripped in SQL instead.
+    cache_path = cache_path_for(cache_dir, "ncvoter_attrs_v3", ncvoter_path, ".parquet")
+    if cache_is_fresh(cache_path, ncvoter_path):
+        print(f"[INFO] ncvoter attributes from cache: {cache_path}")
+        return cache_path
+    staging = cache_staging_path(cache_path)
+    con.execute(
+        """
+        COPY (
+            SELECT
+                replace(trim(column3), '"', '') AS ncid,
+                upper(replace(trim(column1), '"', '')) AS reg_county_desc,
+                replace(trim(column28), '"', '') AS party_cd,
+                replace(trim(column26), '"', '') AS race_code,
+                replace(trim(column27), '"', '') AS ethnic_code,
+                replace(trim(column29), '"', '') AS sex_code,
+                TRY_CAST(replace(trim(column30), '"', '') AS SMALLINT) AS birth_year
+            FROM read_csv(
+                $src, delim='\\t', header=false, quote='', escape='', auto_detect=false,
+                strict_mode=false, ignore_errors=true, null_padding=true, max_line_size=10000000,
+                columns=$columns
+            )
+            WHERE ncid IS NOT NULL
+              AND length(ncid) > 0
+              AND lower(ncid) != 'ncid'
+        ) TO $dest (FORMAT PARQUET, COMPRESSION ZSTD)
+        """,
+        {"src": ncvoter_path, "columns": NCVOTER_COLUMNS, "dest": str(staging)},
+    )
+    publish_cache(staging, cache_path)
+    return cache_path